@@ -1,18 +1,93 @@
 import os
-import requests
-from typing import Dict, Any, List, Optional, Tuple
+import functools
+import asyncio
+import threading
+import time
+import weakref
+import aiohttp
+import diskcache
+import httpx
+import ijson
+import orjson
+from collections import OrderedDict
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple, Union
 
 from smolagents import Tool, CodeAgent, tool
 from smolagents import LiteLLMModel
 import litellm
 
-litellm.model_alias = {}
-litellm._turn_on_debug()
-
 from dotenv import load_dotenv
 
 load_dotenv()
 
+if os.getenv("LITELLM_DEBUG"):
+    litellm._turn_on_debug()
+
+
+# Rate limiting and transient server errors are retried with exponential backoff before they reach the agent
+_RETRIES = 3
+_RETRY_BACKOFF = 0.2
+_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class _RetryTransport(httpx.BaseTransport):
+    """Wrap a transport and retry responses whose status is in _RETRY_STATUSES."""
+
+    def __init__(self, transport: httpx.BaseTransport):
+        self._transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        for attempt in range(_RETRIES):
+            response = self._transport.handle_request(request)
+            if response.status_code not in _RETRY_STATUSES:
+                return response
+            response.close()
+            time.sleep(_RETRY_BACKOFF * 2 ** attempt)
+        return self._transport.handle_request(request)
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+# One HTTP/2 client shared by every tool: concurrent Google requests are multiplexed over a
+# single TLS connection instead of queueing behind each other or opening new connections.
+_HTTP = httpx.Client(
+    timeout=10.0,
+    transport=_RetryTransport(httpx.HTTPTransport(
+        http2=True,
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+        retries=3,
+    )),
+)
+
+
+# Google API responses cached on disk; Google's ToS allows caching for at most 30 days.
+# The directory defaults to .google_cache next to this file and can be moved with GOOGLE_CACHE_DIR.
+_CACHE_TTL = 7 * 86400
+_CACHE: Optional[diskcache.Cache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def _cache() -> diskcache.Cache:
+    """Return the on-disk response cache, opening it on first use rather than at import time."""
+    global _CACHE
+    if _CACHE is None:
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                directory = os.getenv("GOOGLE_CACHE_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), ".google_cache")
+                _CACHE = diskcache.Cache(directory, size_limit=256 << 20)
+    return _CACHE
+
+
+_get_link = itemgetter("link")
+
+
+def _item_link(item: Dict[str, Any]) -> str:
+    """Return a Custom Search item's link, or '#' when it has none."""
+    return _get_link(item) if "link" in item else "#"
+
 
 class GoogleSearchTool(Tool):
     name = "web_search"
@@ -24,6 +99,11 @@ class GoogleSearchTool(Tool):
             "description": "Optionally restrict results to a certain year",
             "nullable": True,
         },
+        "bypass_cache": {
+            "type": "boolean",
+            "description": "Set to true to ignore cached results and query Google again.",
+            "nullable": True,
+        },
     }
     output_type = "string"
 
@@ -32,17 +112,35 @@ class GoogleSearchTool(Tool):
         self.api_key = api_key or os.environ.get("GOOGLE_API_KEY")  # os.getenv("GOOGLE_API_KEY")
         self.cx = cx or os.environ.get("GOOGLE_CSE_ID")
 
-    def forward(self, query: str, filter_year: Optional[int] = None) -> str:
+    def forward(self, query: str, filter_year: Optional[int] = None, bypass_cache: bool = False) -> str:
         """
         Performs a Google web search using the Google Custom Search API.
 
         Args:
             query: The search query string
             filter_year: Optional year to filter results by
+            bypass_cache: Skip the on-disk cache and refresh it with a new request
 
         Returns:
             Formatted string of search results
         """
+        key = ("search", query, filter_year)
+        if not bypass_cache:
+            cached = _cache().get(key)
+            if cached is not None:
+                return cached
+        links = self._search(query, filter_year)
+        if not links:
+            # Empty answers are not cached so a transient miss does not stick for a week
+            year_filter_message = f" with filter year={filter_year}" if filter_year is not None else ""
+            return f"No results found for '{query}'{year_filter_message}. Try with a more general query, or remove the year filter."
+        web_snippets = [f"{idx}. {link}" for idx, link in enumerate(links, 1)]
+        result = "## Search Results\n" + "\n\n".join(web_snippets)
+        _cache().set(key, result, expire=_CACHE_TTL)
+        return result
+
+    def _search(self, query: str, filter_year: Optional[int]) -> List[str]:
+        """Query the Custom Search API and return the result links."""
         if self.api_key is None:
             raise ValueError("Missing Google API key. Make sure you have 'GOOGLE_API_KEY' in your env variables.")
         if self.cx is None:
@@ -56,29 +154,43 @@ class GoogleSearchTool(Tool):
             params["sort"] = "date"
             params["dateRestrict"] = f"y{filter_year}"
         try:
-            response = requests.get(
-                "https://www.googleapis.com/customsearch/v1",
-                params=params,
-                timeout=10
-            )
-            response.raise_for_status()
-            results = response.json()
-        except requests.RequestException as e:
+            with _HTTP.stream("GET", "https://www.googleapis.com/customsearch/v1", params=params) as response:
+                response.raise_for_status()
+                # Stream the items one at a time instead of building the whole response dict;
+                # items without a link keep their slot so the numbering matches Google's ranking
+                links: List[str] = []
+                found = ijson.sendable_list()
+                parser = ijson.items_coro(found, "items.item")
+                for chunk in response.iter_bytes():
+                    parser.send(chunk)
+                    links.extend(map(_item_link, found))
+                    del found[:]
+                parser.close()
+                links.extend(map(_item_link, found))
+        except (httpx.HTTPError, ijson.JSONError) as e:
             raise ValueError(f"Error making request to Google Custom Search API: {str(e)}")
-        if "items" not in results or len(results["items"]) == 0:
-            year_filter_message = f" with filter year={filter_year}" if filter_year is not None else ""
-            return f"No results found for '{query}'{year_filter_message}. Try with a more general query, or remove the year filter."
-        web_snippets: List[str] = []
-        for idx, item in enumerate(results["items"]):
-            title = item.get("title", "No title")
-            link = item.get("link", "#")
-            formatted_result = f"{idx + 1}. {link}"
-            web_snippets.append(formatted_result)
-        return "## Search Results\n" + "\n\n".join(web_snippets)
+        return links
+
+# Places API (New) only returns the fields listed in the field mask; opening hours come back inline,
+# so no follow-up Place Details request is needed per place.
+_PLACES_FIELD_MASK = ",".join([
+    "places.displayName",
+    "places.formattedAddress",
+    "places.id",
+    "places.rating",
+    "places.userRatingCount",
+    "places.regularOpeningHours.periods",
+])
+
+
+# Placeholder shown by _format_places when Places omits an ID; it cannot be looked up.
+_NO_PLACE_ID = "No ID"
+_NO_HOURS = {'open_time': None, 'close_time': None}
+
 
 class GooglePlacesTool(Tool):
     name = "places_search"
-    description = """Searches for places using Google Places API and returns information about matching locations."""
+    description = """Searches for places using Google Places API and returns information about matching locations, including their working hours."""
     inputs = {
         "query": {"type": "string", "description": "The place or business to search for."},
         "location": {
@@ -90,22 +202,35 @@ class GooglePlacesTool(Tool):
             "type": "integer",
             "description": "Search radius in meters. Default is 5000 meters.",
             "nullable": True,
-        }
+        },
+        "bypass_cache": {
+            "type": "boolean",
+            "description": "Set to true to ignore cached results and query Google again.",
+            "nullable": True,
+        },
     }
     output_type = "string"
 
     def __init__(self, api_key=None):
         super().__init__()
         self.google_api_key = os.getenv("GOOGLE_API_KEY", api_key)
-        self.API_TYPE = "textsearch"  # Alternative: "findplacefromtext"
-        self.url = f"https://maps.googleapis.com/maps/api/place/{self.API_TYPE}/json"
+        self.url = "https://places.googleapis.com/v1/places:searchText"
+        self._headers = {
+            "X-Goog-Api-Key": self.google_api_key,
+            "X-Goog-FieldMask": _PLACES_FIELD_MASK,
+        }
 
         # Default coordinates (Belgrade, Serbia)
         self.default_lat = 44.8176
         self.default_lng = 20.4633
         self.default_radius = 5000
+        self._default_location_bias = self._location_bias(self.default_lat, self.default_lng, self.default_radius)
+        # Agents often repeat the same search within a run; answer those from memory before touching disk.
+        # Like the disk cache, only searches that found places are remembered.
+        self._recent_searches: "OrderedDict[Tuple[str, Optional[str], Optional[int]], str]" = OrderedDict()
+        self._recent_searches_size = 128
 
-    def forward(self, query: str, location: Optional[str] = None, radius: Optional[int] = None) -> str:
+    def forward(self, query: str, location: Optional[str] = None, radius: Optional[int] = None, bypass_cache: bool = False) -> str:
         """
         Searches for places using Google Places API.
 
@@ -113,20 +238,46 @@ class GooglePlacesTool(Tool):
             query: The search query for a place or business
             location: Optional comma-separated latitude,longitude string
             radius: Optional search radius in meters
+            bypass_cache: Skip the on-disk cache and refresh it with a new request
 
         Returns:
-            dict: A strings, every sting containg:
-                - name
-                - adress
-                - "place_id" (str): The unique place identifier.
-            }
+            str: One line per place in the form
+                "<n>. <name> | <address> | <place_id> | <open_time>-<close_time> | <rating>",
+                with times in 24-hour format (e.g., '0900')
         """
+        if not query or not query.strip():
+            return "No places found for an empty query. Provide the place or business to search for."
+        key = (query, location, radius)
+        if not bypass_cache and key in self._recent_searches:
+            self._recent_searches.move_to_end(key)
+            return self._recent_searches[key]
+        result, found = self._search(query, location, radius, bypass_cache)
+        if found:
+            self._recent_searches[key] = result
+            self._recent_searches.move_to_end(key)
+            if len(self._recent_searches) > self._recent_searches_size:
+                self._recent_searches.popitem(last=False)
+        else:
+            self._recent_searches.pop(key, None)
+        return result
+
+    def _search(self, query: str, location: Optional[str], radius: Optional[int], bypass_cache: bool = False) -> Tuple[str, bool]:
+        """Search places through the on-disk cache, querying Google on a miss; also report whether any place was found."""
         if self.google_api_key is None:
             raise ValueError("Missing Google API key. Make sure you have 'GOOGLE_API_KEY' in your env variables.")
         lat, lng = self._parse_location(location)
         search_radius = radius if radius is not None else self.default_radius
+        key = ("places", query, round(lat, 4), round(lng, 4), search_radius)
+        if not bypass_cache:
+            cached = _cache().get(key)
+            if cached is not None:
+                return cached, True
         places = self._api_request(query, lat, lng, search_radius)
-        return self._format_places(query, places, lat, lng, search_radius)
+        result = self._format_places(query, places, lat, lng, search_radius)
+        # Empty answers are not cached so a transient miss does not stick for a week
+        if places:
+            _cache().set(key, result, expire=_CACHE_TTL)
+        return result, bool(places)
 
     def _parse_location(self, location: Optional[str]) -> Tuple[float, float]:
         """Parse location string or return defaults."""
@@ -142,119 +293,317 @@ class GooglePlacesTool(Tool):
 
     def _api_request(self, query: str, lat: float = None, lng: float = None, radius: int = 5000) -> List[Dict[str, Any]]:
         """Make request to Google Places API."""
-        if lat is None:
-          lat = self.default_lat
-        if lng is None:
-          lat = self.default_lng
-        params: Dict[str, Any] = {
-            "key": self.google_api_key
-        }
-        if self.API_TYPE == "findplacefromtext":
-            params.update({
-                "input": query,
-                "inputtype": "textquery",
-                "fields": "formatted_address,name,place_id,geometry,types,rating,user_ratings_total",
-                "locationbias": f"circle:{radius}@{lat},{lng}"
-            })
-        else:  # textsearch
-            params.update({
-                "query": query,
-                "location": f"{lat},{lng}",
-                "radius": radius
-            })
+        lat = self.default_lat if lat is None else lat
+        lng = self.default_lng if lng is None else lng
+        if (lat, lng, radius) == (self.default_lat, self.default_lng, self.default_radius):
+            location_bias = self._default_location_bias
+        else:
+            location_bias = self._location_bias(lat, lng, radius)
+        body = {"textQuery": query, "locationBias": location_bias}
         try:
-            response = requests.get(self.url, params=params, timeout=10)
+            response = _HTTP.post(self.url, json=body, headers=self._headers)
             response.raise_for_status()
-            data = response.json()
-            print(data)
-            if self.API_TYPE == "findplacefromtext":
-                return data.get("candidates", [])
-            else:
-                return data.get("results", [])
-        except requests.RequestException as e:
+            data = orjson.loads(response.content)
+            places = data.get("places", [])
+        except httpx.HTTPError as e:
             raise ValueError(f"Error making request to Google Places API: {str(e)}")
+        return [_place_record(place) for place in places]
+
+    @staticmethod
+    def _location_bias(lat: float, lng: float, radius: int) -> Dict[str, Any]:
+        """Build a circular locationBias for places:searchText."""
+        return {"circle": {"center": {"latitude": lat, "longitude": lng}, "radius": float(radius)}}
 
     def _format_places(self, query: str, places: List[Dict[str, Any]], lat: float, lng: float, radius: int) -> str:
         """Format places results as a readable string."""
         if not places:
             return f"No places found for '{query}' within {radius}m of coordinates {lat},{lng}."
         formatted_results = []
-        for idx, place in enumerate(places):
+        for idx, place in enumerate(places, 1):
             name = place.get("name", "Unnamed location")
             address = place.get("formatted_address", "No address available")
-            place_id = place.get("place_id", "No ID")
-            rating_info = ""
+            place_id = place.get("place_id", _NO_PLACE_ID)
+            rating_info = "No rating"
             if "rating" in place:
                 rating = place.get("rating", 0)
                 total_ratings = place.get("user_ratings_total", 0)
-                rating_info = f"\nRating: {rating}/5 ({total_ratings} reviews)"
-            formatted_results.append({'name': name, 'address': address, 'rating_info': rating_info, 'place_id': place_id})
-        return formatted_results
+                rating_info = f"Rating: {rating}/5 ({total_ratings} reviews)"
+            working_hours = place.get("working_hours")
+            if working_hours:
+                hours_info = f"{working_hours['open_time'] or '?'}-{working_hours['close_time'] or '?'}"
+            else:
+                hours_info = "Hours unknown"
+            formatted_results.append(f"{idx}. {name} | {address} | {place_id} | {hours_info} | {rating_info}")
+        return "\n".join(formatted_results)
+
+def _place_record(place: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a Places API (New) place onto the legacy field names used by _format_places."""
+    record: Dict[str, Any] = {}
+    if "displayName" in place:
+        record["name"] = place["displayName"].get("text")
+    if "formattedAddress" in place:
+        record["formatted_address"] = place["formattedAddress"]
+    if "id" in place:
+        record["place_id"] = place["id"]
+    if "rating" in place:
+        record["rating"] = place["rating"]
+        record["user_ratings_total"] = place.get("userRatingCount", 0)
+    periods = place.get("regularOpeningHours", {}).get("periods") or []
+    if periods:
+        record["working_hours"] = {
+            'open_time': _format_point(periods[0].get("open")),
+            'close_time': _format_point(periods[0].get("close")),
+        }
+    return record
+
+def _format_point(point: Optional[Dict[str, int]]) -> Optional[str]:
+    """Format a Places API (New) period point as a 24-hour 'HHMM' string."""
+    if not point:
+        return None
+    return f"{point.get('hour', 0):02d}{point.get('minute', 0):02d}"
+
+_DETAILS_URL = "https://maps.googleapis.com/maps/api/place/details/json"
+_DETAILS_FIELDS = "opening_hours/periods"
 
 @tool
-def get_place_working_hours(place_id: str) -> dict:
+def get_place_working_hours(place_id: Union[str, List[str]], bypass_cache: bool = False) -> dict:
     """
     Fetches working hours for a place using the Google Places API.
     
     This function retrieves information about opening hours and closing hours and return a dict with fields: 
             - open_time (str): Opening time in 24-hour format (e.g., '0900')
             - close_time (str): Closing time in 24-hour format (e.g., '1700')
+    The result is already a dict and needs no parsing; if you serialize it, use `orjson.dumps` rather than `json`.
     
     Args:
-        place_id: The Google Place ID for the location you want information about
+        place_id: The Google Place ID for the location you want information about, or a list of Place IDs to look up concurrently
+        bypass_cache: Set to True to ignore cached working hours and query Google again
     
     Returns:
         dict: A dictionary containing the place's operating hours with the keys:
             - open_time (str): Opening time in 24-hour format (e.g., '0900')
-            - close_time (str): Closing time in 24-hour format (e.g., '1700')
+            - close_time (str): Closing time in 24-hour format (e.g., '1700'), None when unknown or open 24 hours
+            When a list of Place IDs is given, a dictionary mapping every distinct Place ID to such a dictionary;
+            a place that could not be looked up gets None times and an 'error' key instead of failing the whole call.
             
     Example:
         >>> result = get_place_working_hours(place_id="ChIJj61dQgK6j4AR4GeTYWZsKWw")
         >>> print(result)
         {'open_time': '0900', 'close_time': '1700'}
     """
-    google_api_key = os.environ['GOOGLE_API_KEY']
-    fields='name,url,opening_hours'
-    print(fields)
-    params = {
-        "place_id": place_id,
-        "fields": fields,
-        "key": google_api_key
-    }
-    url = f"https://maps.googleapis.com/maps/api/place/details/json"
-    headers = {}
-    response = requests.get(url, params=params, headers=headers).json()
-    hours = response['result']['opening_hours']['periods'][0]
-    res = {'open_time': hours['open']['time'], 'close_time': hours['close']['time']}
+    if isinstance(place_id, list):
+        return _fetch_many_working_hours(place_id, bypass_cache, use_asyncio=False)
+    return _fetch_working_hours(place_id, bypass_cache)
+
+def _fetch_many_working_hours(place_ids: List[str], bypass_cache: bool, use_asyncio: bool) -> Dict[str, Dict[str, Optional[str]]]:
+    """Look up each distinct place ID once, concurrently.
+
+    With use_asyncio the lookups run on a fresh aiohttp event loop; when the caller's thread already
+    runs a loop (Jupyter, async Gradio handlers) asyncio.run is not allowed, so threads are used instead.
+    """
+    unique = list(dict.fromkeys(place_ids))
+    if not unique:
+        return {}
+    if use_asyncio and not _in_event_loop():
+        results = asyncio.run(_gather_working_hours(unique, bypass_cache))
+    else:
+        with ThreadPoolExecutor(max_workers=min(16, len(unique))) as ex:
+            results = list(ex.map(lambda pid: _hours_or_error(pid, bypass_cache), unique))
+    return dict(zip(unique, results))
+
+def _hours_or_error(place_id: str, bypass_cache: bool) -> Dict[str, Optional[str]]:
+    """Look up one place for a list call; a failure becomes an 'error' entry so other places still return."""
+    try:
+        return _fetch_working_hours(place_id, bypass_cache)
+    except ValueError as e:
+        return {**_NO_HOURS, 'error': str(e)}
+
+def _in_event_loop() -> bool:
+    """Whether the current thread is already running an asyncio event loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+def _fetch_working_hours(place_id: str, bypass_cache: bool) -> Dict[str, Optional[str]]:
+    """Look up one place's working hours through the on-disk cache and the shared HTTP client."""
+    hours = _known_working_hours(place_id, bypass_cache)
+    if hours is not None:
+        return hours
+    try:
+        response = _HTTP.get(_DETAILS_URL, params=_details_params(place_id))
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        raise ValueError(f"Error making request to Google Place Details API: {str(e)}")
+    return _store_working_hours(place_id, orjson.loads(response.content))
+
+def _known_working_hours(place_id: str, bypass_cache: bool) -> Optional[Dict[str, Optional[str]]]:
+    """Return hours that need no request (missing ID or cache hit), or None if Google must be queried."""
+    if not place_id or place_id == _NO_PLACE_ID:
+        return dict(_NO_HOURS)
+    if bypass_cache:
+        return None
+    return _cache().get(("details", place_id))
+
+def _details_params(place_id: str) -> Dict[str, str]:
+    """Query parameters for a Place Details request."""
+    return {"place_id": place_id, "fields": _DETAILS_FIELDS, "key": os.environ['GOOGLE_API_KEY']}
+
+def _store_working_hours(place_id: str, response: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    """Parse a Place Details response and cache the working hours on disk; error responses raise and are not cached."""
+    res = _parse_working_hours(response)
+    _cache().set(("details", place_id), res, expire=_CACHE_TTL)
     return res
 
-if __name__ == '__main__':
-    api_key = os.getenv("GOOGLE_API_KEY")
-    print('Finished')
-    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+def _parse_working_hours(response: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    """Extract the first opening period from a Place Details response.
+
+    Places without opening hours yield None for both times, and 24-hour places have no close time.
+    Any status other than OK, ZERO_RESULTS or NOT_FOUND raises ValueError.
+    """
+    status = response.get("status")
+    if status in ("ZERO_RESULTS", "NOT_FOUND"):
+        return dict(_NO_HOURS)
+    if status != "OK":
+        message = response.get("error_message", "no error message")
+        raise ValueError(f"Error from Google Place Details API: {status}: {message}")
+    result = response.get("result") or {}
+    opening_hours = result.get("opening_hours") or {}
+    periods = opening_hours.get("periods") or []
+    if not periods:
+        return dict(_NO_HOURS)
+    hours = periods[0]
+    return {'open_time': (hours.get('open') or {}).get('time'), 'close_time': (hours.get('close') or {}).get('time')}
+
+# aiohttp sessions are bound to the event loop they were created on, so keep one per running loop
+_AIOHTTP_SESSIONS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = weakref.WeakKeyDictionary()
+
+async def _session() -> aiohttp.ClientSession:
+    """Return the aiohttp session for the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    session = _AIOHTTP_SESSIONS.get(loop)
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=20, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=10),
+        )
+        _AIOHTTP_SESSIONS[loop] = session
+    return session
+
+async def get_place_working_hours_async(place_id: str, bypass_cache: bool = False) -> Dict[str, Optional[str]]:
+    """
+    Async counterpart of get_place_working_hours for a single place.
+
+    Concurrent calls on the same event loop share one aiohttp session, so callers can simply
+    gather several lookups. The session belongs to the caller's event loop: await close_sessions()
+    before the loop shuts down.
+
+    Args:
+        place_id: The Google Place ID for the location you want information about
+        bypass_cache: Set to True to ignore cached working hours and query Google again
+
+    Returns:
+        dict: open_time and close_time in 24-hour format (e.g., '0900'), None when unknown
+    """
+    hours = _known_working_hours(place_id, bypass_cache)
+    if hours is not None:
+        return hours
+    sess = await _session()
+    try:
+        for attempt in range(_RETRIES + 1):
+            async with sess.get(_DETAILS_URL, params=_details_params(place_id)) as r:
+                if r.status in _RETRY_STATUSES and attempt < _RETRIES:
+                    await asyncio.sleep(_RETRY_BACKOFF * 2 ** attempt)
+                    continue
+                r.raise_for_status()
+                data = await r.json(loads=orjson.loads, content_type=None)
+                break
+    except aiohttp.ClientError as e:
+        raise ValueError(f"Error making request to Google Place Details API: {str(e)}")
+    return _store_working_hours(place_id, data)
+
+async def _hours_or_error_async(place_id: str, bypass_cache: bool) -> Dict[str, Optional[str]]:
+    """Async counterpart of _hours_or_error."""
+    try:
+        return await get_place_working_hours_async(place_id, bypass_cache)
+    except ValueError as e:
+        return {**_NO_HOURS, 'error': str(e)}
+
+async def close_sessions() -> None:
+    """Close the aiohttp session opened for the running event loop by get_place_working_hours_async."""
+    session = _AIOHTTP_SESSIONS.pop(asyncio.get_running_loop(), None)
+    if session is not None:
+        await session.close()
+
+async def _gather_working_hours(place_ids: List[str], bypass_cache: bool) -> List[Dict[str, Optional[str]]]:
+    """Look up all place IDs concurrently, closing this loop's session once done."""
+    try:
+        return await asyncio.gather(*[_hours_or_error_async(place_id, bypass_cache) for place_id in place_ids])
+    finally:
+        await close_sessions()
+
+@tool
+def get_place_working_hours_batch(place_ids: List[str], bypass_cache: bool = False) -> dict:
+    """
+    Fetches working hours for several places at once using the Google Places API.
+
+    All requests are sent concurrently, so prefer this tool over calling get_place_working_hours
+    one place at a time.
+
+    Args:
+        place_ids: The list of Google Place IDs for the locations you want information about
+        bypass_cache: Set to True to ignore cached working hours and query Google again
+
+    Returns:
+        dict: A dictionary mapping every distinct place ID to a dict with the keys:
+            - open_time (str): Opening time in 24-hour format (e.g., '0900')
+            - close_time (str): Closing time in 24-hour format (e.g., '1700'), None when unknown or open 24 hours
+            - error (str): Only present when that place could not be looked up (e.g. an invalid place ID)
+
+    Example:
+        >>> result = get_place_working_hours_batch(place_ids=["ChIJj61dQgK6j4AR4GeTYWZsKWw"])
+        >>> print(result)
+        {'ChIJj61dQgK6j4AR4GeTYWZsKWw': {'open_time': '0900', 'close_time': '1700'}}
+    """
+    return _fetch_many_working_hours(place_ids, bypass_cache, use_asyncio=True)
+
+@functools.lru_cache(maxsize=1)
+def build_agent() -> CodeAgent:
+    """Build the restaurant agent once; later calls reuse the same model client and tools."""
     openai_model = LiteLLMModel(
         model_id="gpt-3.5-turbo",
-        api_key=OPENAI_API_KEY,
+        api_key=os.getenv("OPENAI_API_KEY"),
         temperature=0.7,
         max_tokens=4096
     )
-    adress_tool = GooglePlacesTool(api_key=api_key)
-    agent = CodeAgent(
-        tools=[adress_tool, get_place_working_hours],
+    adress_tool = GooglePlacesTool(api_key=os.getenv("GOOGLE_API_KEY"))
+    return CodeAgent(
+        tools=[adress_tool, get_place_working_hours, get_place_working_hours_batch],
         model=openai_model,
         additional_authorized_imports=[
             "json",
+            "orjson",
         ],
     )
+
+if __name__ == '__main__':
+    agent = build_agent()
     result = agent.run(
         """List of Michelin restaurants in Belgrade with lnks and working hours and adresses
 
-        Use adress_tool tool to get a restaurants list
-
-        Once you have a list of restaurants, utilize the get_place_working_hours tool to retrieve working hours by passing the place ID in the tool one by one.
+        Use adress_tool tool to get a restaurants list, it already includes the working hours of every restaurant.
         
         After identifying a restaurant with the latest closing time, print only this specific restaurant.
+
+        The places_search output is plain text with one "name | address | place_id | hours | rating" line per place; do not parse it as JSON.
+        The working hours tools already return dicts. If you need to serialize structured results, use orjson.dumps instead of json.
         """
     )
-    with open('output.txt', 'w', encoding='utf8') as f:
-        f.write(result)
+    # The final answer may be structured; orjson validates it and writes UTF-8 directly
+    if isinstance(result, str):
+        output = result.encode('utf8')
+    else:
+        output = orjson.dumps(result, option=orjson.OPT_INDENT_2)
+    with open('output.txt', 'wb') as f:
+        f.write(output)